@@ -1,11 +1,72 @@
 import requests
-from bs4 import BeautifulSoup
-import time
-import random
+from bs4 import BeautifulSoup, SoupStrainer
+import lxml.html
+from lxml import etree
 import csv
 import argparse
 import re
-import sys
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from scraper_session import POLITENESS_DELAY, create_session, was_throttled
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.5'
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Return the session shared by every request to www.imdb.com.
+    
+    It is created on first use, so importing this module does not touch the
+    cache file.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session('.imdb_cache.sqlite', HEADERS, pool_connections=4, pool_maxsize=32)
+    return _session
+
+_TT_RE = re.compile(r'(tt\d+)')
+_YEAR_RE = re.compile(r'\(\d{4}\)')
+_FNAME_RE = re.compile(r'[^\w\s-]')
+
+def _has_class(name):
+    """XPath predicate matching elements that carry the CSS class `name`."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+# Compiled XPath expressions for the review listing pages
+REVIEWS_XPATH = etree.XPath(f'//article[{_has_class("user-review-item")}]')
+ALT_REVIEWS_XPATH = etree.XPath(f'//div[{_has_class("ipc-list-card--border-speech")}]')
+RATING_XPATH = etree.XPath(
+    f'.//span[{_has_class("ipc-rating-star")}]//span[{_has_class("ipc-rating-star--rating")}]/text()'
+)
+TITLE_XPATH = etree.XPath(f'.//h3[{_has_class("ipc-title__text")}]')
+# Text of the title without the chevron icon's svg
+TITLE_TEXT_XPATH = etree.XPath('.//text()[not(ancestor::svg)]')
+AUTHOR_XPATH = etree.XPath('string(.//div[@data-testid="reviews-author"]//a[@data-testid="author-link"])')
+DATE_XPATH = etree.XPath(f'string(.//div[@data-testid="reviews-author"]//li[{_has_class("review-date")}])')
+PERMALINK_XPATH = etree.XPath('.//div[@data-testid="reviews-author"]//a[@data-testid="permalink-link"]/@href')
+INLINE_TEXT_XPATH = etree.XPath(f'.//div[{_has_class("ipc-html-content-inner-div")}]')
+EXPAND_BUTTON_XPATH = etree.XPath(f'boolean(.//button[{_has_class("ipc-see-more__button")}])')
+LOAD_MORE_KEY_XPATH = etree.XPath(f'//div[{_has_class("load-more-data")}]/@data-key')
+# Fallback: the parent of a button whose text is "Load More"
+LOAD_MORE_BUTTON_KEY_XPATH = etree.XPath(
+    r'//button[re:test(string(.), "Load\s+More")]/../@data-key',
+    namespaces={'re': 'http://exslt.org/regular-expressions'}
+)
+
+# Number of full review pages fetched concurrently
+MAX_REVIEW_WORKERS = 8
+
+# Only build the parts of a full review page that the scraper actually reads
+FULL_REVIEW_STRAINER = SoupStrainer(
+    attrs={'class': re.compile(r'(^|\s)(text|content)(\s|$)|Content__ReviewContent')}
+)
 
 def get_movie_id(movie_url):
     """Extract IMDb movie ID from URL or return the ID if already provided."""
@@ -13,7 +74,7 @@ def get_movie_id(movie_url):
         return movie_url
     
     # Try to extract the ID using regex
-    match = re.search(r'(tt\d+)', movie_url)
+    match = _TT_RE.search(movie_url)
     if match:
         return match.group(1)
     else:
@@ -21,35 +82,111 @@ def get_movie_id(movie_url):
 
 def get_movie_title(movie_id):
     """Get the movie title for the given IMDb ID."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'en-US,en;q=0.5'
-    }
-    
     url = f'https://www.imdb.com/title/{movie_id}/'
-    response = requests.get(url, headers=headers)
+    response = get_session().get(url)
     
     if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
+        soup = BeautifulSoup(response.text, 'lxml')
         # Try different selectors as IMDb may have multiple title formats
         title_elem = soup.select_one('h1[data-testid="hero__pageTitle"]') or soup.find('h1') or soup.select_one('.title_wrapper h1')
         if title_elem:
             # Clean up the title to remove year and other info
             title_text = title_elem.text.strip()
             # Remove year pattern (YYYY) if present
-            title_text = re.sub(r'\(\d{4}\)', '', title_text).strip()
+            title_text = _YEAR_RE.sub('', title_text).strip()
             return title_text
     
     return movie_id  # Return the ID if title can't be found
 
-def scrape_reviews(movie_id_or_url, max_pages=5, delay_range=(3, 7)):
+def get_inline_review_text(container):
+    """Return the review text shipped in the listing, or None if it is missing or truncated."""
+    text_elems = INLINE_TEXT_XPATH(container)
+    if not text_elems:
+        return None
+    
+    text = ' '.join(part.strip() for part in text_elems[0].itertext() if part.strip())
+    truncated = text.endswith(('...', '\u2026')) and EXPAND_BUTTON_XPATH(container)
+    if not text or truncated:
+        return None
+    
+    return text
+
+def fetch_full_review(permalink):
+    """Fetch a review's permalink page and return the full review text."""
+    full_review_url = f"https://www.imdb.com{permalink}"
+    review_response = get_session().get(full_review_url)
+    review_soup = BeautifulSoup(review_response.content, 'lxml', parse_only=FULL_REVIEW_STRAINER)
+    
+    # Look for the review text in various possible containers
+    review_text_elem = (
+        review_soup.find('div', class_='text show-more__control') or
+        review_soup.find('div', class_='content') or
+        review_soup.select_one('[class*="Content__ReviewContent"]')
+    )
+    
+    if review_text_elem:
+        return review_text_elem.text.strip()
+    
+    print(f"Could not find review text for {full_review_url}")
+    return "Review text not available"
+
+def produce_listing_pages(base_url, max_pages, pages, stop, errors):
+    """
+    Fetch and parse review listing pages, putting each tree on the `pages` queue.
+    
+    Runs in its own thread so the next listing page downloads while the
+    consumer is still fetching the current page's permalinks. A None is
+    always put last to mark the end of the listing; an unexpected error is
+    appended to `errors` first so the consumer can re-raise it.
+    """
+    url = base_url
+    throttled = False
+    try:
+        for page_number in range(1, max_pages + 1):
+            if stop.wait(POLITENESS_DELAY if throttled else 0):
+                break
+            
+            print(f"Scraping page {page_number} from: {url}")
+            
+            try:
+                response = get_session().get(url)
+                throttled = throttled or was_throttled(response)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                print(f"Error fetching page: {e}")
+                break
+            
+            try:
+                # The _ajax pages are fragments with no <meta charset>, so decode
+                # with the same encoding response.text would use. Parsing bytes
+                # also accepts documents that carry an XML encoding declaration.
+                parser = lxml.html.HTMLParser(encoding=response.encoding or response.apparent_encoding)
+                tree = lxml.html.fromstring(response.content, parser=parser)
+            except etree.ParserError as e:
+                print(f"Error parsing page: {e}")
+                break
+            
+            pages.put(tree)
+            
+            # Check for next page - look for the pagination key
+            pagination_keys = LOAD_MORE_KEY_XPATH(tree) or LOAD_MORE_BUTTON_KEY_XPATH(tree)
+            if not pagination_keys:
+                print("No more pages available.")
+                break
+            
+            url = f"{base_url}/_ajax?paginationKey={pagination_keys[0]}"
+    except Exception as e:
+        errors.append(e)
+    finally:
+        pages.put(None)
+
+def scrape_reviews(movie_id_or_url, max_pages=5):
     """
     Scrape movie reviews from IMDb using the latest HTML structure.
     
     Args:
         movie_id_or_url: IMDb movie ID (tt12345) or URL
         max_pages: Maximum number of review pages to scrape
-        delay_range: Range for random delay between requests (in seconds)
     
     Returns:
         List of review dictionaries and movie title
@@ -57,11 +194,6 @@ def scrape_reviews(movie_id_or_url, max_pages=5, delay_range=(3, 7)):
     movie_id = get_movie_id(movie_id_or_url)
     reviews = []
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'en-US,en;q=0.5'
-    }
-    
     print(f"Starting to scrape reviews for movie ID: {movie_id}")
     movie_title = get_movie_title(movie_id)
     print(f"Movie title: {movie_title}")
@@ -69,152 +201,106 @@ def scrape_reviews(movie_id_or_url, max_pages=5, delay_range=(3, 7)):
     # Use the direct reviews URL format
     base_url = f'https://www.imdb.com/title/{movie_id}/reviews'
     
-    pages_scraped = 0
-    pagination_key = None
+    # Listing pages are fetched by a producer thread at most a couple of pages
+    # ahead, while this thread parses reviews and fetches their permalinks
+    pages = queue.Queue(maxsize=2)
+    stop = threading.Event()
+    errors = []
+    producer = threading.Thread(
+        target=produce_listing_pages,
+        args=(base_url, max_pages, pages, stop, errors),
+        daemon=True
+    )
+    producer.start()
     
-    while pages_scraped < max_pages:
-        # For first page or when we have a pagination key
-        if pages_scraped == 0:
-            url = base_url
-        elif pagination_key:
-            url = f"{base_url}/_ajax?paginationKey={pagination_key}"
-        else:
-            break
-            
-        pages_scraped += 1
-        print(f"Scraping page {pages_scraped} from: {url}")
-        
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching page: {e}")
-            break
+    tree = None
+    with ThreadPoolExecutor(max_workers=MAX_REVIEW_WORKERS) as executor:
+        while True:
+            tree = pages.get()
+            if tree is None:
+                break
             
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find review containers based on the new IMDb structure
-        # Based on the provided HTML, reviews are in article elements with class="user-review-item"
-        review_containers = soup.find_all('article', class_='user-review-item')
-        
-        if not review_containers:
-            print("No reviews found on this page. Trying alternative selectors...")
-            # Try alternative selectors
-            review_containers = soup.find_all('div', class_='ipc-list-card--border-speech')
+            # Find review containers based on the new IMDb structure
+            # Based on the provided HTML, reviews are in article elements with class="user-review-item"
+            review_containers = REVIEWS_XPATH(tree)
             
             if not review_containers:
-                print("No reviews found with alternative selectors either.")
-                break
-        
-        print(f"Found {len(review_containers)} reviews on this page")
-        
-        for container in review_containers:
-            try:
-                review_data = {}
+                print("No reviews found on this page. Trying alternative selectors...")
+                # Try alternative selectors
+                review_containers = ALT_REVIEWS_XPATH(tree)
                 
-                # Get rating (if available)
-                # Look for the rating span with class="ipc-rating-star"
-                rating_element = container.find('span', class_='ipc-rating-star')
-                if rating_element:
-                    rating_value = rating_element.find('span', class_='ipc-rating-star--rating')
-                    review_data['rating'] = rating_value.text.strip() if rating_value else "N/A"
-                else:
-                    review_data['rating'] = "N/A"
-                
-                # Get review title
-                # Look for the h3 with class="ipc-title__text"
-                title_element = container.find('h3', class_='ipc-title__text')
-                if title_element:
-                    # Remove the chevron icon from the title
-                    title_text = re.sub(r'<svg.*?</svg>', '', str(title_element)).strip()
-                    title_soup = BeautifulSoup(title_text, 'html.parser')
-                    review_data['title'] = title_soup.text.strip()
-                else:
-                    review_data['title'] = "No Title"
-                
-                # Get reviewer name and date
-                # Updated selector for author information
-                author_section = container.find('div', {'data-testid': 'reviews-author'})
-                if author_section:
-                    author_link = author_section.find('a', {'data-testid': 'author-link'})
-                    review_data['reviewer'] = author_link.text.strip() if author_link else "Anonymous"
+                if not review_containers:
+                    print("No reviews found with alternative selectors either.")
+                    break
+            
+            print(f"Found {len(review_containers)} reviews on this page")
+            
+            page_reviews = []
+            for container in review_containers:
+                try:
+                    review_data = {}
                     
-                    # Get date
-                    date_element = author_section.find('li', class_='review-date')
-                    review_data['date'] = date_element.text.strip() if date_element else "Unknown date"
-                else:
-                    review_data['reviewer'] = "Anonymous"
-                    review_data['date'] = "Unknown date"
-                
-                # Get review text
-                # This is challenging as it's not directly visible in the HTML snippet
-                # We'll need to follow the permalink to get the full review text
-                permalink = None
-                permalink_link = None
-                
-                if author_section:
-                    permalink_link = author_section.find('a', {'data-testid': 'permalink-link'})
-                
-                if permalink_link and 'href' in permalink_link.attrs:
-                    permalink = permalink_link['href']
+                    # Get rating (if available)
+                    rating_values = RATING_XPATH(container)
+                    review_data['rating'] = rating_values[0].strip() if rating_values else "N/A"
+                    
+                    # Get review title
+                    title_elements = TITLE_XPATH(container)
+                    if title_elements:
+                        review_data['title'] = ''.join(TITLE_TEXT_XPATH(title_elements[0])).strip()
+                    else:
+                        review_data['title'] = "No Title"
+                    
+                    # Get reviewer name and date
+                    review_data['reviewer'] = AUTHOR_XPATH(container).strip() or "Anonymous"
+                    review_data['date'] = DATE_XPATH(container).strip() or "Unknown date"
+                    
+                    # Get review text
+                    # The listing usually ships the full text; only follow the
+                    # permalink when it is missing or truncated
+                    permalink = None
+                    review_text = get_inline_review_text(container)
+                    
+                    if review_text:
+                        review_data['text'] = review_text
+                    else:
+                        permalinks = PERMALINK_XPATH(container)
+                        if permalinks:
+                            permalink = permalinks[0]
                     
-                if permalink:
-                    # Fetch the full review page
-                    full_review_url = f"https://www.imdb.com{permalink}"
+                    page_reviews.append((review_data, permalink))
+                    
+                except Exception as e:
+                    print(f"Error parsing a review: {e}")
+                    continue
+            
+            # Fetch the remaining full review pages concurrently; the pool size is the throttle
+            futures = [
+                executor.submit(fetch_full_review, permalink) if permalink else None
+                for _, permalink in page_reviews
+            ]
+            
+            for (review_data, permalink), future in zip(page_reviews, futures):
+                if future is None:
+                    review_data.setdefault('text', "No permalink available to fetch full review")
+                else:
                     try:
-                        # Add a short delay before fetching the full review
-                        time.sleep(random.uniform(1, 2))
-                        review_response = requests.get(full_review_url, headers=headers)
-                        review_soup = BeautifulSoup(review_response.text, 'html.parser')
-                        
-                        # Look for the review text in various possible containers
-                        review_text_elem = (
-                            review_soup.find('div', class_='text show-more__control') or
-                            review_soup.find('div', class_='content') or
-                            review_soup.select_one('[class*="Content__ReviewContent"]')
-                        )
-                        
-                        if review_text_elem:
-                            review_data['text'] = review_text_elem.text.strip()
-                        else:
-                            print(f"Could not find review text for {full_review_url}")
-                            review_data['text'] = "Review text not available"
+                        review_data['text'] = future.result()
                     except Exception as e:
                         print(f"Error fetching full review: {e}")
                         review_data['text'] = "Error fetching full review"
-                else:
-                    review_data['text'] = "No permalink available to fetch full review"
-                    
-                # If we got to this point, we have a complete review
+                
                 reviews.append(review_data)
                 print(f"Scraped review by {review_data['reviewer']}: {review_data['title'][:30]}...")
-                
-            except Exception as e:
-                print(f"Error parsing a review: {e}")
-                continue
-        
-        # Check for next page - look for the pagination key
-        pagination_key = None
-        load_more = soup.find('div', class_='load-more-data')
-        if load_more and 'data-key' in load_more.attrs:
-            pagination_key = load_more['data-key']
-        else:
-            # Look for button with "Load More" text
-            load_more_btn = soup.find('button', string=re.compile(r'Load\s+More'))
-            if load_more_btn:
-                parent = load_more_btn.parent
-                if parent and 'data-key' in parent.attrs:
-                    pagination_key = parent['data-key']
-        
-        if not pagination_key:
-            print("No more pages available.")
-            break
-        
-        # Be respectful with a random delay between requests
-        if pages_scraped < max_pages:
-            delay = random.uniform(delay_range[0], delay_range[1])
-            print(f"Waiting {delay:.2f} seconds before next request...")
-            time.sleep(delay)
+    
+    # Stop the producer early if we broke out, draining so it never blocks on put
+    stop.set()
+    while tree is not None:
+        tree = pages.get()
+    producer.join()
+    
+    if errors:
+        raise errors[0]
     
     print(f"Scraped {len(reviews)} reviews in total.")
     return reviews, movie_title
@@ -223,16 +309,15 @@ def save_to_csv(reviews, movie_title, filename=None):
     """Save reviews to a CSV file."""
     if not filename:
         # Clean movie title for filename
-        clean_title = re.sub(r'[^\w\s-]', '', movie_title).strip().replace(' ', '_')
+        clean_title = _FNAME_RE.sub('', movie_title).strip().replace(' ', '_')
         filename = f"{clean_title}_reviews.csv"
     
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+    with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
         fieldnames = ['reviewer', 'title', 'rating', 'date', 'text']
         writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
         
         writer.writeheader()
-        for review in reviews:
-            writer.writerow(review)
+        writer.writerows(reviews)
     
     print(f"Reviews saved to {filename}")
 
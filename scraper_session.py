@@ -0,0 +1,41 @@
+import os
+
+import requests_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Cache files live next to the scrapers so every working directory shares them
+CACHE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pause between pages once the server has asked us to slow down
+POLITENESS_DELAY = 0.2
+
+def create_session(cache_name, headers, pool_connections, pool_maxsize):
+    """Create a disk-cached session with a pooled, retrying HTTPS adapter."""
+    session = requests_cache.CachedSession(
+        os.path.join(CACHE_DIR, cache_name),
+        backend='sqlite',
+        expire_after=24 * 3600,
+        allowable_methods=('GET',)
+    )
+    session.mount('https://', HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        # Exponential backoff on 429/5xx, honouring Retry-After
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+    ))
+    session.headers.update(headers)
+    return session
+
+def was_throttled(response):
+    """Return True if the server answered the request, or any retry of it, with a 429."""
+    if response.status_code == 429:
+        return True
+    retries = getattr(response.raw, 'retries', None)
+    return bool(retries and any(attempt.status == 429 for attempt in retries.history))
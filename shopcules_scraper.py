@@ -1,10 +1,12 @@
 import requests
 from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 import csv
-import argparse
 import time
 import re
-from datetime import datetime
+from scraper_session import POLITENESS_DELAY, create_session, was_throttled
+
+_PID_RE = re.compile(r'(\d+)\.html')
 
 class ShopCluesScraper:
     def __init__(self, url=None):
@@ -13,13 +15,34 @@ class ShopCluesScraper:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept-Language': 'en-US,en;q=0.9',
         }
+        self._session = None
+        self.timeout = 15
         self.product_data = {}
         self.reviews = []
     
+    @property
+    def session(self):
+        """HTTP session, created (along with its cache file) on first use"""
+        if self._session is None:
+            self._session = create_session('.shopclues_cache.sqlite', self.headers, pool_connections=1, pool_maxsize=10)
+        return self._session
+    
+    def close(self):
+        """Release the pooled connections"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
     def fetch_page(self, url):
         """Fetch the HTML content of a page"""
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
             return response.text
         except requests.exceptions.RequestException as e:
@@ -28,7 +51,7 @@ class ShopCluesScraper:
     
     def parse_product_info(self, html):
         """Extract product information from the page"""
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, 'lxml')
         
         # Extract product details
         try:
@@ -79,30 +102,30 @@ class ShopCluesScraper:
             return False
     
     def parse_reviews(self, html):
-        """Extract reviews from the page"""
-        soup = BeautifulSoup(html, 'html.parser')
+        """Extract reviews from the page, given its HTML or an already parsed tree"""
+        tree = html if isinstance(html, LexborHTMLParser) else LexborHTMLParser(html)
         reviews_list = []
         
         # Find all review items
-        review_items = soup.select('div.rnr_lists ul li')
+        review_items = tree.css('div.rnr_lists ul li')
         
         for item in review_items:
             try:
                 # Extract review details
-                rating_span = item.select_one('div.prd_ratings span')
-                rating = rating_span.text.strip() if rating_span else "N/A"
+                rating_span = item.css_first('div.prd_ratings span')
+                rating = rating_span.text().strip() if rating_span else "N/A"
                 
-                reviewer = item.select_one('div.r_by')
-                reviewer_name = reviewer.text.strip() if reviewer else "Anonymous"
+                reviewer = item.css_first('div.r_by')
+                reviewer_name = reviewer.text().strip() if reviewer else "Anonymous"
                 
-                date_elem = item.select_one('div.r_date')
-                date_str = date_elem.text.strip() if date_elem else ""
+                date_elem = item.css_first('div.r_date')
+                date_str = date_elem.text().strip() if date_elem else ""
                 
-                verified = item.select_one('div.use_type')
-                verified_status = verified.text.strip() if verified else "N/A"
+                verified = item.css_first('div.use_type')
+                verified_status = verified.text().strip() if verified else "N/A"
                 
-                review_text = item.select_one('div.review_desc p')
-                review_content = review_text.text.strip() if review_text else "No content"
+                review_text = item.css_first('div.review_desc p')
+                review_content = review_text.text().strip() if review_text else "No content"
                 
                 # Clean up any extra data in reviewer name
                 if '<!--' in reviewer_name:
@@ -139,21 +162,23 @@ class ShopCluesScraper:
         if not html:
             return []
         
-        all_reviews = self.parse_reviews(html)
+        # Parse the first page once for both its reviews and the pagination link
+        tree = LexborHTMLParser(html)
+        all_reviews = self.parse_reviews(tree)
         
         # Check if there's pagination for reviews and handle accordingly
         # This is a starting point - you might need to adjust this logic
         # based on how ShopClues implements pagination
-        soup = BeautifulSoup(html, 'html.parser')
-        load_more = soup.select_one('div.load_more a#moreReview')
+        load_more = tree.css_first('div.load_more a#moreReview')
         
         page = 1
         # If "Load more reviews" button exists, we need to simulate AJAX calls
         if load_more:
             # Extract product ID from URL
-            product_id_match = re.search(r'(\d+)\.html', self.url)
+            product_id_match = _PID_RE.search(self.url)
             if product_id_match:
                 product_id = product_id_match.group(1)
+                throttled = False
                 
                 while True:
                     page += 1
@@ -161,7 +186,8 @@ class ShopCluesScraper:
                     ajax_url = f"https://www.shopclues.com/ajaxCall/getReviews?product_id={product_id}&page={page}"
                     
                     try:
-                        response = requests.get(ajax_url, headers=self.headers)
+                        response = self.session.get(ajax_url, timeout=self.timeout)
+                        throttled = throttled or was_throttled(response)
                         if response.status_code != 200:
                             break
                         
@@ -171,8 +197,7 @@ class ShopCluesScraper:
                             break
                         
                         # Parse reviews from HTML in JSON
-                        review_soup = BeautifulSoup(data['html'], 'html.parser')
-                        page_reviews = self.parse_reviews(str(review_soup))
+                        page_reviews = self.parse_reviews(data['html'])
                         
                         if not page_reviews:
                             break
@@ -180,8 +205,9 @@ class ShopCluesScraper:
                         all_reviews.extend(page_reviews)
                         print(f"Fetched {len(page_reviews)} reviews from page {page}")
                         
-                        # Sleep to prevent rate limiting
-                        time.sleep(1)
+                        # Only pause between pages if the server has rate limited us
+                        if throttled:
+                            time.sleep(POLITENESS_DELAY)
                         
                     except Exception as e:
                         print(f"Error fetching reviews page {page}: {e}")
@@ -218,7 +244,7 @@ class ShopCluesScraper:
     def save_to_csv(self, output_file):
         """Save product information and reviews to CSV files"""
         try:
-            with open(output_file, 'w', newline='', encoding='utf-8') as f:
+            with open(output_file, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
                 writer = csv.writer(f)
                 
                 # Write product information section
@@ -232,8 +258,7 @@ class ShopCluesScraper:
                 if self.product_data.get('specifications'):
                     writer.writerow([])  # Empty row for spacing
                     writer.writerow(['SPECIFICATIONS'])
-                    for key, value in self.product_data['specifications'].items():
-                        writer.writerow([key, value])
+                    writer.writerows(self.product_data['specifications'].items())
                 
                 # Write reviews section
                 if self.reviews:
@@ -241,14 +266,17 @@ class ShopCluesScraper:
                     writer.writerow(['PRODUCT REVIEWS'])
                     writer.writerow(['reviewer_name', 'rating', 'date', 'verified_status', 'review_content'])
                     
-                    for review in self.reviews:
-                        writer.writerow([
+                    rows = [
+                        [
                             review.get('reviewer_name', ''),
                             review.get('rating', ''),
                             review.get('date', ''),
                             review.get('verified_status', ''),
                             review.get('review_content', '')
-                        ])
+                        ]
+                        for review in self.reviews
+                    ]
+                    writer.writerows(rows)
             
             print(f"All data saved to {output_file}")
             
@@ -268,11 +296,11 @@ def main():
     print(f"\nProduct: {product_name}")
     
     print("\nStarting scraper...")
-    scraper = ShopCluesScraper(url)
-    if scraper.scrape_product():
-        output_file = f"{product_name}.csv"
-        scraper.save_to_csv(output_file)
-        print("\nScraping completed successfully!")
+    with ShopCluesScraper(url) as scraper:
+        if scraper.scrape_product():
+            output_file = f"{product_name}.csv"
+            scraper.save_to_csv(output_file)
+            print("\nScraping completed successfully!")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file